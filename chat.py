@@ -1,3 +1,9 @@
+import hashlib
+import os
+import queue
+import shutil
+import tempfile
+
 from lm.base_lm_client import BaseLMClient
 from lm.cerebras_lm_client import CerebrasLMClient
 from lm.openai_lm_client import OpenAILMClient
@@ -6,53 +12,145 @@ from prompts.scenario_manager import ScenarioManager, ScenarioTemplate
 
 class Chat:
 
-    def __init__(self, scenario_description: str = None, scenario_name: str = None):
-        self.lm_client: BaseLMClient = CerebrasLMClient()
-        # self.lm_client: BaseLMClient = OpenAILMClient()
+    def __init__(self, scenario_description: str = None, scenario_name: str = None,
+                 page_cache_dir: str = "page_cache", use_cache: bool = True):
+        self._lm_client_factory = CerebrasLMClient
+        # self._lm_client_factory = OpenAILMClient
+        # Pool of LM clients so concurrent requests (threaded Flask,
+        # gunicorn gthread workers) each get their own client instead of
+        # serializing on a shared one; up to 8 idle clients are kept warm
+        self._client_pool: queue.Queue = queue.Queue(maxsize=8)
         self.scenario_manager = ScenarioManager()
+        self.page_cache_dir = page_cache_dir
+        self.use_cache = use_cache
         
         # Handle scenario selection
+        self.current_scenario_name: str | None = None
         if scenario_name:
             scenario_template = self.scenario_manager.get_scenario(scenario_name)
             if scenario_template:
                 scenario_description = scenario_template.scenario
+                self.current_scenario_name = scenario_name
             else:
                 print(f"Scenario '{scenario_name}' not found. Using default scenario.")
                 default_scenario = self.scenario_manager.get_scenario("etherweave")
                 scenario_description = default_scenario.scenario if default_scenario else "A fictional alternative internet"
+                self.current_scenario_name = "etherweave" if default_scenario else None
         elif not scenario_description:
             # If no scenario provided, use the default
             default_scenario = self.scenario_manager.get_scenario("etherweave")
             scenario_description = default_scenario.scenario if default_scenario else "A fictional alternative internet"
-        
+            self.current_scenario_name = "etherweave" if default_scenario else None
+
+        if self.current_scenario_name is None:
+            self.current_scenario_name = self.scenario_manager.name_for_scenario_description(scenario_description)
+
         self.scenario_description = scenario_description
-        
-        # Initialize conversation with system prompt
-        self.conversation: list[dict[str, str]] = [
-            {
-                "role": "system",
-                "content": self.get_system_prompt(scenario_description=scenario_description)
-            }
-        ]
 
-    def browse_to_page(self, path: str) -> str:
-        self.conversation.append(
+        # Only the static system prompt is kept; pages are independent of
+        # each other, so each request is built fresh from it. Keeping the
+        # prefix byte-identical across calls lets provider-side prompt
+        # caching fire on every request.
+        self.system_message: dict[str, str] = {
+            "role": "system",
+            "content": self.get_system_prompt(scenario_description=scenario_description)
+        }
+
+    def _page_cache_path(self, path: str) -> str:
+        """Compute the on-disk cache location for a (scenario, path) pair."""
+        scenario_key = hashlib.sha256(self.scenario_description.encode()).hexdigest()[:16]
+        page_key = hashlib.sha256((self.scenario_description + "\0" + path).encode()).hexdigest()
+        return os.path.join(self.page_cache_dir, scenario_key, f"{page_key}.html")
+
+    def _read_cached_page(self, path: str) -> str | None:
+        """Return the cached HTML for a path, or None on a cache miss."""
+        if not self.use_cache:
+            return None
+        try:
+            with open(self._page_cache_path(path), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_cached_page(self, path: str, html: str) -> None:
+        """Atomically persist a generated page to the on-disk cache."""
+        if not self.use_cache:
+            return
+        cache_path = self._page_cache_path(path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(html)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def clear_page_cache(self) -> None:
+        """Evict all cached pages for the current scenario."""
+        scenario_key = hashlib.sha256(self.scenario_description.encode()).hexdigest()[:16]
+        shutil.rmtree(os.path.join(self.page_cache_dir, scenario_key), ignore_errors=True)
+
+    def _acquire_client(self) -> BaseLMClient:
+        """Take an idle LM client from the pool, creating one if none is free."""
+        try:
+            return self._client_pool.get_nowait()
+        except queue.Empty:
+            return self._lm_client_factory()
+
+    def _release_client(self, client: BaseLMClient) -> None:
+        """Return a client to the pool; surplus clients are simply dropped."""
+        try:
+            self._client_pool.put_nowait(client)
+        except queue.Full:
+            pass
+
+    def _build_messages(self, path: str) -> list[dict[str, str]]:
+        """Build a stateless [system, user] request for a single page."""
+        return [
+            self.system_message,
             {
                 "role": "user",
                 "content": f"""The user has browsed to the following path: "{path}".
 Generate an HTML page as instructed for this path based on the scenario given. Remember to only respond with the HTML site and no additional comment whatsoever."""
             }
-        )
-        response: str = self.lm_client.do_chat_completion(messages=self.conversation)
-        self.conversation.append(
-            {
-                "role": "assistant",
-                "content": response
-            }
-        )
+        ]
+
+    def browse_to_page(self, path: str) -> str:
+        cached = self._read_cached_page(path)
+        if cached is not None:
+            print("Serving cached page.")
+            return cached
+        client = self._acquire_client()
+        try:
+            response: str = client.do_chat_completion(messages=self._build_messages(path))
+        finally:
+            self._release_client(client)
+        self._write_cached_page(path, response)
         print("Generated page.")
         return response
     
+    def stream_page(self, path: str):
+        """Yield the HTML for a path chunk by chunk, caching the joined result."""
+        cached = self._read_cached_page(path)
+        if cached is not None:
+            print("Serving cached page.")
+            yield cached
+            return
+        chunks: list[str] = []
+        client = self._acquire_client()
+        try:
+            for chunk in client.do_streaming_chat_completion(messages=self._build_messages(path)):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            self._release_client(client)
+        self._write_cached_page(path, "".join(chunks))
+        print("Generated page.")
+
     def get_available_scenarios(self):
         """Get list of all available scenarios with descriptions."""
         scenarios = []
@@ -78,16 +176,15 @@ Generate an HTML page as instructed for this path based on the scenario given. R
             else:
                 print(f"Scenario '{scenario_name}' not found.")
                 return False
-        
+
         if scenario_description:
+            self.current_scenario_name = scenario_name or self.scenario_manager.name_for_scenario_description(scenario_description)
             self.scenario_description = scenario_description
-            # Reset conversation with new scenario
-            self.conversation = [
-                {
-                    "role": "system",
-                    "content": self.get_system_prompt(scenario_description=scenario_description)
-                }
-            ]
+            # Rebuild the system prompt for the new scenario
+            self.system_message = {
+                "role": "system",
+                "content": self.get_system_prompt(scenario_description=scenario_description)
+            }
             return True
         return False
 
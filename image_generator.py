@@ -2,23 +2,126 @@ import os
 import io
 import re
 import base64
-import requests
+import atexit
+import functools
+import hashlib
+import json
+import threading
+import httpx
 import fal_client
+from PIL import Image
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, Optional, Callable
 
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_image_base64(image_path: str, mtime: float) -> str:
+    """Read and base64-encode an image, memoized on (path, mtime)."""
+    with open(image_path, 'rb') as f:
+        image_data = f.read()
+
+    ext = os.path.splitext(image_path)[1].lower()
+    mime_type = {
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg',
+        '.webp': 'image/webp'
+    }.get(ext, 'image/png')
+
+    encoded = base64.b64encode(image_data).decode('utf-8')
+
+    return f"data:{mime_type};base64,{encoded}"
+
 
 class ImageGenerator:
     """Handles image generation using fal.ai's API."""
     
-    def __init__(self, cache_dir: str = "image_cache"):
+    def __init__(self, cache_dir: str = "image_cache", max_side: int = 768, quality: int = 82):
         """
         Initialize the image generator.
-        
+
         Args:
             cache_dir: Directory to cache generated images
+            max_side: Longest edge images are downscaled to on save
+            quality: WebP quality used when saving
         """
         self.cache_dir = cache_dir
+        self.max_side = max_side
+        self.quality = quality
         os.makedirs(cache_dir, exist_ok=True)
+        # Bounded pool for background pre-generation; the worker count also
+        # acts as a rate limit on concurrent fal.ai jobs
+        self._executor = ThreadPoolExecutor(max_workers=8)
+        # Pooled HTTP/2 client so image downloads reuse one TLS session
+        # instead of paying a fresh handshake per image
+        self._http = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32),
+            timeout=30
+        )
+        atexit.register(self._http.close)
+        # Map original LLM-emitted filenames to their canonical cache files
+        # so near-duplicate prompts share one generated image
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._index_lock = threading.Lock()
+        self._index: Dict[str, str] = self._load_index()
+        # In-flight generations keyed by cache name so concurrent requests
+        # for the same image share one fal.ai call
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, str]:
+        """Load the filename -> cache-file index, tolerating a missing file."""
+        try:
+            with open(self._index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self) -> None:
+        """Atomically persist the filename index."""
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self._index_path)
+
+    def _indexed_path(self, image_name: str) -> Optional[str]:
+        """
+        Resolve an original filename through the index.
+
+        Args:
+            image_name: The name of the image file
+
+        Returns:
+            Path of the recorded cache file, or None if not indexed or
+            the file no longer exists
+        """
+        cached_name = self._index.get(image_name)
+        if cached_name:
+            image_path = os.path.join(self.cache_dir, cached_name)
+            if os.path.exists(image_path):
+                return image_path
+        return None
+
+    def canonical_cache_name(self, image_name: str) -> str:
+        """
+        Derive the canonical cache filename for an image.
+
+        The prompt words are lowercased and sorted so reorderings of the
+        same descriptive filename ("blue-glowing-portal" vs
+        "glowing-blue-portal") collapse onto one cache entry.
+
+        Args:
+            image_name: The name of the image file
+
+        Returns:
+            Hashed cache filename including the original extension
+        """
+        prompt = self.process_image_name(image_name)
+        canonical = " ".join(sorted(prompt.lower().split()))
+        key = hashlib.sha1(canonical.encode()).hexdigest()[:16]
+        return f"{key}.webp"
     
     def process_image_name(self, image_name: str) -> str:
         """
@@ -37,7 +140,7 @@ class ImageGenerator:
         name = name.replace('-', ' ').replace('_', ' ')
         
         # Clean up extra spaces
-        name = re.sub(r'\s+', ' ', name).strip()
+        name = WHITESPACE_RE.sub(' ', name).strip()
         
         # If the prompt is too short, enhance it
         if len(name) < 10:
@@ -56,32 +159,72 @@ class ImageGenerator:
         Returns:
             Dictionary containing the generated image data
         """
-        def on_queue_update(update):
-            if isinstance(update, fal_client.InProgress) and callback:
-                for log in update.logs:
-                    callback(log["message"])
-            # No-op for other log messages
-        
         # Enhance the prompt to generate better images
         enhanced_prompt = f"{prompt}, high quality, detailed"
         print(f"Generating image with prompt: '{enhanced_prompt}'")
-        
-        # Generate the image
-        result = fal_client.subscribe(
-            "fal-ai/flux/schnell",
-            arguments={
-                "prompt": enhanced_prompt
-            },
-            with_logs=True,
-            on_queue_update=on_queue_update,
-        )
-        
+
+        if callback:
+            # Progress logs require the event stream, so only pay for the
+            # subscribe machinery when someone is listening
+            def on_queue_update(update):
+                if isinstance(update, fal_client.InProgress):
+                    for log in update.logs:
+                        callback(log["message"])
+
+            result = fal_client.subscribe(
+                "fal-ai/flux/schnell",
+                arguments={
+                    "prompt": enhanced_prompt
+                },
+                with_logs=True,
+                on_queue_update=on_queue_update,
+            )
+        else:
+            # submit + get avoids the subscribe poll cadence: completion is
+            # bounded by server time, not the poll interval
+            handle = fal_client.submit(
+                "fal-ai/flux/schnell",
+                arguments={
+                    "prompt": enhanced_prompt
+                }
+            )
+            result = handle.get()
+
+        return self._normalize_result(result)
+
+    @staticmethod
+    def _normalize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a fal.ai result so 'images' is always a list."""
         # The Flux model returns a specific format
         if isinstance(result, dict) and 'images' in result and not isinstance(result['images'], list):
             # If images is not a list, convert it to the expected format
             result['images'] = [result['images']]
-        
+
         return result
+
+    def generate_images_batch(self, prompts: list) -> list:
+        """
+        Generate several images with one pipelined dispatch.
+
+        The Flux endpoint has no multi-prompt input (num_images only
+        replicates a single prompt), so the amortization comes from
+        submitting every job to the queue before awaiting the first
+        result, letting the provider run them concurrently.
+
+        Args:
+            prompts: Text prompts, one per image
+
+        Returns:
+            List of result dictionaries in prompt order
+        """
+        handles = [
+            fal_client.submit(
+                "fal-ai/flux/schnell",
+                arguments={"prompt": f"{prompt}, high quality, detailed"}
+            )
+            for prompt in prompts
+        ]
+        return [self._normalize_result(handle.get()) for handle in handles]
     
     def save_image(self, image_data: Dict[str, Any], image_name: str) -> str:
         """
@@ -94,10 +237,10 @@ class ImageGenerator:
         Returns:
             Path to the saved image
         """
-        # Ensure image name has the right extension
-        if not image_name.lower().endswith(('.png', '.jpg', '.jpeg')):
-            image_name = f"{image_name}.png"
-            
+        # Persist everything as WebP: typically 3-5x smaller than the PNG
+        # fal.ai returns, at equivalent visual quality
+        image_name = f"{os.path.splitext(image_name)[0]}.webp"
+
         # Create full path
         image_path = os.path.join(self.cache_dir, image_name)
         
@@ -110,7 +253,7 @@ class ImageGenerator:
                 # Case 1: Image URL in a dictionary
                 if isinstance(image_item, dict) and 'url' in image_item:
                     image_url = image_item['url']
-                    response = requests.get(image_url)
+                    response = self._http.get(image_url)
                     response.raise_for_status()  # Ensure we got a valid response
                     image_content = response.content
                 
@@ -138,12 +281,97 @@ class ImageGenerator:
         except Exception as e:
             raise ValueError(f"Failed to process image data: {e}")
         
-        # Save to file
-        with open(image_path, 'wb') as f:
-            f.write(image_content)
-            
+        # Downscale and transcode to WebP: these images are illustrative,
+        # so the native 1024px output is wasted bytes down the pipeline
+        img = Image.open(io.BytesIO(image_content))
+        img.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+        img.save(image_path, 'WEBP', quality=self.quality, method=4)
+
         return image_path
     
+    def prefetch_image(self, image_name: str) -> None:
+        """
+        Warm the cache for an image in the background.
+
+        Args:
+            image_name: Name of the image file
+        """
+        self._executor.submit(self._prefetch_one, image_name)
+
+    def _prefetch_one(self, image_name: str) -> None:
+        """Background worker for prefetch_image; failures are logged only."""
+        try:
+            self.get_or_generate_image(image_name)
+        except Exception as e:
+            print(f"Error pre-generating image '{image_name}': {e}")
+
+    def prefetch_images(self, image_names: list) -> None:
+        """
+        Warm the cache for a group of images with one batched dispatch.
+
+        Args:
+            image_names: Names of the image files
+        """
+        pending = []
+        seen = set()
+        for image_name in image_names:
+            if not os.path.splitext(image_name)[1]:
+                image_name = f"{image_name}.png"
+            cache_name = self.canonical_cache_name(image_name)
+            if cache_name in seen:
+                continue
+            seen.add(cache_name)
+            if os.path.exists(os.path.join(self.cache_dir, cache_name)):
+                continue
+            if self._indexed_path(image_name):
+                continue
+            if os.path.exists(os.path.join(self.cache_dir, image_name)):
+                continue
+            pending.append(image_name)
+        if pending:
+            self._executor.submit(self._prefetch_batch, pending)
+
+    def _prefetch_batch(self, image_names: list) -> None:
+        """Background worker for prefetch_images: claim in-flight slots,
+        dispatch one batch, and complete the futures as results land."""
+        futures: Dict[str, Future] = {}
+        claimed: list = []
+        with self._inflight_lock:
+            for image_name in image_names:
+                cache_name = self.canonical_cache_name(image_name)
+                if cache_name in self._inflight:
+                    continue  # another caller is already generating it
+                future = Future()
+                self._inflight[cache_name] = future
+                futures[image_name] = future
+                claimed.append(image_name)
+        if not claimed:
+            return
+
+        try:
+            prompts = [self.process_image_name(name) for name in claimed]
+            results = self.generate_images_batch(prompts)
+            for image_name, result in zip(claimed, results):
+                future = futures[image_name]
+                try:
+                    image_path = self.save_image(result, self.canonical_cache_name(image_name))
+                    with self._index_lock:
+                        self._index[image_name] = os.path.basename(image_path)
+                        self._save_index()
+                    future.set_result(image_path)
+                except Exception as e:
+                    print(f"Error saving pre-generated image '{image_name}': {e}")
+                    future.set_exception(e)
+        except Exception as e:
+            print(f"Error pre-generating image batch: {e}")
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                for image_name in claimed:
+                    self._inflight.pop(self.canonical_cache_name(image_name), None)
+
     def get_or_generate_image(self, image_name: str) -> str:
         """
         Get an image from cache or generate it if not available.
@@ -157,21 +385,65 @@ class ImageGenerator:
         # Ensure image name has the right extension if it doesn't have one
         if not os.path.splitext(image_name)[1]:
             image_name = f"{image_name}.png"
-            
-        # Check if image exists in cache
-        image_path = os.path.join(self.cache_dir, image_name)
+
+        # Check the canonical cache entry first so reworded duplicates of
+        # the same prompt share one generated image
+        cache_name = self.canonical_cache_name(image_name)
+        image_path = os.path.join(self.cache_dir, cache_name)
         if os.path.exists(image_path):
             print(f"Using cached image: {image_path}")
             return image_path
-            
-        # Generate new image
+
+        # Consult the index for filenames recorded by earlier generations,
+        # which survives changes to the canonical naming scheme
+        indexed_path = self._indexed_path(image_name)
+        if indexed_path:
+            print(f"Using cached image: {indexed_path}")
+            return indexed_path
+
+        # Fall back to images cached under their original filename
+        legacy_path = os.path.join(self.cache_dir, image_name)
+        if os.path.exists(legacy_path):
+            print(f"Using cached image: {legacy_path}")
+            return legacy_path
+
+        # Deduplicate concurrent generations: the first caller owns the
+        # generation, everyone else waits on its future
+        with self._inflight_lock:
+            future = self._inflight.get(cache_name)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[cache_name] = future
+        if not is_owner:
+            return future.result()
+
+        try:
+            image_path = self._generate_and_save(image_name, cache_name)
+            future.set_result(image_path)
+            return image_path
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_name, None)
+
+    def _generate_and_save(self, image_name: str, cache_name: str) -> str:
+        """Generate an image, save it under its canonical cache name and
+        record the original filename in the index."""
         prompt = self.process_image_name(image_name)
         print(f"Generating image for: {prompt}")
-        
+
         image_data = self.generate_image(prompt)
-        
-        # Save and return path
-        return self.save_image(image_data, image_name)
+
+        # Save under the canonical name and record the original filename
+        # so the URL the LLM emitted still resolves
+        image_path = self.save_image(image_data, cache_name)
+        with self._index_lock:
+            self._index[image_name] = os.path.basename(image_path)
+            self._save_index()
+        return image_path
         
     def get_image_as_base64(self, image_name: str) -> str:
         """
@@ -185,16 +457,7 @@ class ImageGenerator:
         """
         # Get image path
         image_path = self.get_or_generate_image(image_name)
-        
-        # Read and encode
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-            
-        # Determine mime type
-        ext = os.path.splitext(image_path)[1].lower()
-        mime_type = 'image/jpeg' if ext in ['.jpg', '.jpeg'] else 'image/png'
-        
-        # Encode to base64
-        encoded = base64.b64encode(image_data).decode('utf-8')
-        
-        return f"data:{mime_type};base64,{encoded}"
\ No newline at end of file
+
+        # Cached images never change in place, so the encoded data URL can
+        # be reused until the file's mtime moves
+        return _encode_image_base64(image_path, os.path.getmtime(image_path))
\ No newline at end of file
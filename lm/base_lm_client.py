@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Generator
 
 
 class BaseLMClient(ABC):
@@ -18,5 +19,5 @@ class BaseLMClient(ABC):
                                      model: str = None,
                                      max_completion_tokens: int = None,
                                      temperature: float = None,
-                                     top_p: float = None) -> str:
+                                     top_p: float = None) -> Generator[str, None, None]:
         pass
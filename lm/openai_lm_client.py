@@ -10,6 +10,14 @@ class OpenAILMClient(BaseLMClient):
         super().__init__()
         self.client = OpenAI()
 
+    @staticmethod
+    def _as_developer_messages(messages: list[dict[str, str]]) -> list[dict[str, str]]:
+        """Return messages with the leading system role patched to
+        "developer" without mutating the caller's list."""
+        if messages and messages[0].get("role") == "system":
+            return [{**messages[0], "role": "developer"}, *messages[1:]]
+        return messages
+
     def do_chat_completion(self,
                            messages: list[dict[str, str]],
                            model: str = "o3-mini-2025-01-31",
@@ -17,12 +25,9 @@ class OpenAILMClient(BaseLMClient):
                            temperature: float = 1,
                            top_p: float = 1,
                            reasoning_effort: Literal["low", "medium", "high"] = "low") -> str:
-        for message in messages:
-            if message.get("role") == "system":
-                message["role"] = "developer"
         response = self.client.chat.completions.create(
             model=model,
-            messages=messages,
+            messages=self._as_developer_messages(messages),
             max_completion_tokens=max_completion_tokens,
             temperature=temperature,
             top_p=top_p,
@@ -34,7 +39,18 @@ class OpenAILMClient(BaseLMClient):
     def do_streaming_chat_completion(self,
                                      messages: list[dict[str, str]],
                                      model: str = "o3-mini-2025-01-31",
-                                     max_completion_tokens: int = 1024,
+                                     max_completion_tokens: int = 32768,
                                      temperature: float = 1,
-                                     top_p: float = 1) -> Generator[str, None, None]:
-        pass
+                                     top_p: float = 1,
+                                     reasoning_effort: Literal["low", "medium", "high"] = "low") -> Generator[str, None, None]:
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=self._as_developer_messages(messages),
+            max_completion_tokens=max_completion_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stream=True,
+            reasoning_effort=reasoning_effort
+        )
+        for chunk in stream:
+            yield chunk.choices[0].delta.content or ""
@@ -1,13 +1,40 @@
-from flask import Flask, request, render_template_string, redirect, url_for, jsonify, send_file
+import orjson
+from flask import Flask, request, redirect, url_for, send_from_directory, Response, stream_with_context
 from chat import Chat
 from image_generator import ImageGenerator
 import os
 import re
 
 app = Flask(__name__)
+# Let the fronting web server (e.g. nginx) send image bytes directly via
+# X-Sendfile when one is configured for it
+app.use_x_sendfile = os.environ.get("USE_X_SENDFILE") == "1"
 chat = Chat(scenario_name="etherweave")  # Default to EtherWeave scenario
 image_generator = ImageGenerator(cache_dir="image_cache")
 
+IMAGE_EXT_RE = re.compile(r'\.(jpe?g|png|gif|webp)$', re.I)
+IMG_SRC_RE = re.compile(r'<img[^>]+src="([^"]+)"')
+
+
+def stream_page_with_image_prefetch(path):
+    """Stream the generated page, kicking off image generation for every
+    <img> tag as soon as it appears in the stream."""
+    html = ""
+    prefetched = set()
+    for chunk in chat.stream_page(path):
+        html += chunk
+        batch = []
+        for match in IMG_SRC_RE.finditer(html):
+            src = match.group(1)
+            if src in prefetched:
+                continue
+            prefetched.add(src)
+            if IMAGE_EXT_RE.search(src):
+                batch.append(os.path.basename(src))
+        if batch:
+            image_generator.prefetch_images(batch)
+        yield chunk
+
 # Simple form template for selecting or adding scenarios
 TEMPLATE = """
 <!DOCTYPE html>
@@ -139,42 +166,74 @@ TEMPLATE = """
 </html>
 """
 
+# Compile the admin template once at import time instead of re-parsing the
+# template string on every /admin hit
+ADMIN_TEMPLATE = app.jinja_env.from_string(TEMPLATE)
+
+# Rendered admin page and serialized scenario list, reused until a
+# scenario is added or changed
+_admin_html_cache = None
+_scenarios_json_cache = None
+
+
+def invalidate_scenario_caches():
+    global _admin_html_cache, _scenarios_json_cache
+    _admin_html_cache = None
+    _scenarios_json_cache = None
+
+
+def ojsonify(obj, status=200):
+    """Serialize a JSON response via orjson, bypassing flask.jsonify."""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+@app.after_request
+def add_image_cache_headers(response):
+    """Mark generated images as immutable so browsers never re-fetch them."""
+    # Check the response, not just the path: a failed generation falls
+    # through to an HTML page, which must stay uncached so the image can
+    # be retried on the next visit
+    if IMAGE_EXT_RE.search(request.path) and response.mimetype.startswith('image/'):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def catch_all(path):
     # Special case for the admin page
     if path == 'admin':
-        scenarios = chat.get_available_scenarios()
-        # Find the current scenario name based on the description
-        current_scenario = next(
-            (s["name"] for s in scenarios if chat.scenario_description.startswith(s["description"][:20])), 
-            "Custom"
-        )
-        return render_template_string(
-            TEMPLATE, 
-            scenarios=scenarios,
-            current_scenario=current_scenario
-        )
+        global _admin_html_cache
+        if _admin_html_cache is None:
+            _admin_html_cache = ADMIN_TEMPLATE.render(
+                scenarios=chat.get_available_scenarios(),
+                current_scenario=chat.current_scenario_name or "Custom"
+            )
+        return _admin_html_cache
     
     # Check if this is an image request (path ends with image extension)
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    if any(path.lower().endswith(ext) for ext in image_extensions):
+    if IMAGE_EXT_RE.search(path):
         # Get image name and create prompt from it
         image_name = os.path.basename(path)
         prompt = image_generator.process_image_name(image_name)
         print(f"Generating image for: {prompt}")
         
-        # Generate or retrieve image
+        # Generate or retrieve image; serve it with conditional-request
+        # support so revisits get 304s (or pure browser-cache hits)
         try:
             image_path = image_generator.get_or_generate_image(image_name)
-            return send_file(image_path)
+            return send_from_directory(
+                image_generator.cache_dir,
+                os.path.basename(image_path),
+                conditional=True,
+                max_age=31536000
+            )
         except Exception as e:
             print(f"Error generating image: {e}")
             # If image generation fails, continue to normal page handling
         
-    # Normal page handling
-    html_content = chat.browse_to_page('/' + path)
-    return html_content
+    # Normal page handling: stream the generated HTML so the browser can
+    # start rendering as soon as the first tokens arrive
+    return Response(stream_with_context(stream_page_with_image_prefetch('/' + path)), mimetype='text/html')
 
 @app.route('/add-scenario', methods=['POST'])
 def add_scenario():
@@ -187,7 +246,8 @@ def add_scenario():
     
     chat.add_custom_scenario(name, description, scenario)
     chat.change_scenario(scenario_name=name)
-    
+    invalidate_scenario_caches()
+
     return redirect('/admin')
 
 @app.route('/select-scenario', methods=['POST'])
@@ -195,41 +255,51 @@ def select_scenario():
     scenario_name = request.form.get('scenario_name')
     if scenario_name:
         chat.change_scenario(scenario_name=scenario_name)
-    
+        invalidate_scenario_caches()
+
     return redirect('/admin')
 
 @app.route('/api/scenarios', methods=['GET'])
 def get_scenarios():
     """API endpoint to get all available scenarios"""
-    return jsonify(chat.get_available_scenarios())
+    global _scenarios_json_cache
+    if _scenarios_json_cache is None:
+        _scenarios_json_cache = orjson.dumps(chat.get_available_scenarios())
+    return Response(_scenarios_json_cache, mimetype='application/json')
 
 @app.route('/api/scenarios/current', methods=['GET'])
 def get_current_scenario():
     """API endpoint to get the current scenario"""
-    scenarios = chat.get_available_scenarios()
-    current_scenario = next(
-        (s for s in scenarios if chat.scenario_description.startswith(s["description"][:20])), 
-        {"name": "custom", "description": "Custom scenario"}
-    )
-    return jsonify(current_scenario)
+    if chat.current_scenario_name:
+        scenario = chat.scenario_manager.get_scenario(chat.current_scenario_name)
+        if scenario:
+            return ojsonify({"name": scenario.name, "description": scenario.description})
+    return ojsonify({"name": "custom", "description": "Custom scenario"})
 
 @app.route('/api/scenarios/change', methods=['POST'])
 def api_change_scenario():
     """API endpoint to change the current scenario"""
     data = request.json
     if not data:
-        return jsonify({"error": "Missing request body"}), 400
-    
+        return ojsonify({"error": "Missing request body"}, status=400)
+
     scenario_name = data.get('name')
     if not scenario_name:
-        return jsonify({"error": "Missing scenario name"}), 400
-    
+        return ojsonify({"error": "Missing scenario name"}, status=400)
+
     success = chat.change_scenario(scenario_name=scenario_name)
     if success:
-        return jsonify({"success": True, "message": f"Changed to scenario: {scenario_name}"})
+        invalidate_scenario_caches()
+        return ojsonify({"success": True, "message": f"Changed to scenario: {scenario_name}"})
     else:
-        return jsonify({"success": False, "error": f"Scenario not found: {scenario_name}"}), 404
+        return ojsonify({"success": False, "error": f"Scenario not found: {scenario_name}"}, status=404)
         
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Alternative Internet server")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the on-disk page cache")
+    args = parser.parse_args()
+    if args.no_cache:
+        chat.use_cache = False
     app.run(debug=True, port=8080)
@@ -1,23 +1,103 @@
 import os
 import json
-from typing import Dict, List, Optional
+import logging
+import mmap
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Collection, Dict, List, Optional, Union
 
+# Prefer orjson's SIMD-accelerated parser for template files, falling back
+# to the stdlib when it is not installed
+try:
+    import orjson
 
+    def _json_loads(data: bytes) -> Dict:
+        return orjson.loads(data)
+
+    def _json_dump_bytes(obj: Dict) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    orjson = None
+
+    def _json_loads(data: bytes) -> Dict:
+        return json.loads(data)
+
+    def _json_dump_bytes(obj: Dict) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+
+logger = logging.getLogger(__name__)
+
+# Errors a malformed or unreadable template file can produce: both JSON
+# decoders raise ValueError subclasses, and indexing into a non-object
+# top level (e.g. a file holding a bare list) raises TypeError
+_LOAD_ERRORS = (OSError, ValueError, KeyError, TypeError)
+
+# Below this size the mmap setup cost outweighs saving the read copy
+_MMAP_THRESHOLD = 64 * 1024
+
+
+def _load_template_dict(path: str) -> Dict:
+    """
+    Read and parse one template file with raw os calls.
+
+    Small files are slurped with a single pread, skipping the buffered-I/O
+    machinery that open().read() sets up per file. Files above
+    _MMAP_THRESHOLD (long worldbuilding prose) are mmapped instead so the
+    parser reads straight from the page cache without a kernel-to-user
+    copy.
+
+    Args:
+        path: File to read
+
+    Returns:
+        Parsed template dictionary
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size <= _MMAP_THRESHOLD:
+            return _json_loads(os.pread(fd, size, 0))
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            if orjson is None:
+                # stdlib json cannot parse a buffer, so copy out of the map
+                return _json_loads(bytes(mm))
+            view = memoryview(mm)
+            try:
+                return _json_loads(view)
+            finally:
+                view.release()
+    finally:
+        os.close(fd)
+
+
+@dataclass(frozen=True, slots=True)
 class ScenarioTemplate:
-    """Class to manage scenario description templates."""
+    """
+    Immutable scenario description template.
 
-    def __init__(self, name: str, description: str, scenario: str):
-        """
-        Initialize a scenario template.
-        
-        Args:
-            name: Unique identifier for the template
-            description: Human-readable description of this scenario
-            scenario: The full scenario description text
-        """
-        self.name = name
-        self.description = description
-        self.scenario = scenario
+    Attributes:
+        name: Unique identifier for the template
+        description: Human-readable description of this scenario
+        scenario: The full scenario description text
+    """
+    name: str
+    description: str
+    scenario: str
+    # Serialized forms, computed once since instances never change
+    _dict: Dict = field(default=None, init=False, repr=False, compare=False)
+    _json_bytes: bytes = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Interned names hit the identity fast path in dict lookups
+        object.__setattr__(self, 'name', sys.intern(self.name))
+        object.__setattr__(self, '_dict', {
+            "name": self.name,
+            "description": self.description,
+            "scenario": self.scenario
+        })
+        object.__setattr__(self, '_json_bytes', _json_dump_bytes(self._dict))
 
     @classmethod
     def from_dict(cls, data: Dict) -> "ScenarioTemplate":
@@ -30,24 +110,65 @@ class ScenarioTemplate:
         Returns:
             ScenarioTemplate instance
         """
-        return cls(
-            name=data["name"],
-            description=data["description"],
-            scenario=data["scenario"]
-        )
+        key = (data["name"], data["description"], data["scenario"])
+        cached = _INSTANCE_CACHE.get(key)
+        if cached is None:
+            cached = _INSTANCE_CACHE[key] = cls(
+                name=key[0],
+                description=key[1],
+                scenario=key[2]
+            )
+        return cached
 
     def to_dict(self) -> Dict:
         """
         Convert template to dictionary for serialization.
-        
+
         Returns:
             Dictionary representation of the template
         """
-        return {
-            "name": self.name,
-            "description": self.description,
-            "scenario": self.scenario
-        }
+        return self._dict
+
+    def to_json_bytes(self) -> bytes:
+        """
+        Serialized JSON form of the template.
+
+        Returns:
+            Indented JSON as bytes, encoded once at construction
+        """
+        return self._json_bytes
+
+
+# Instances are immutable, so identical template data loaded repeatedly
+# (re-created managers, tests) can share one object instead of
+# re-allocating; scenario counts are small, so the pool is unbounded
+_INSTANCE_CACHE: Dict[tuple, ScenarioTemplate] = {}
+
+
+# The built-in scenarios are constants, so they live in source instead of
+# being written to and re-parsed from JSON files
+_DEFAULT_SCENARIOS = (
+    ScenarioTemplate(
+            name="etherweave",
+            description="Ancient magical internet powered by alchemy and arcane forces",
+            scenario="""Imagine a world where the Internet was not born from silicon and code but from the ancient, arcane machinations of alchemists in the late Renaissance. In this alternate timeline, mystics uncovered the secret of the "EtherWeave"—a luminous network spun from enchanted fibers and quantum spells that intertwined the minds of scholars, artists, and adventurers across Europe and beyond. Instead of servers, colossal magical conduits known as Arcanet Pillars powered communication, channeling not only information but also the very essence of human creativity, passion, and memory. Navigating the EtherWeave felt akin to embarking on a fantastical voyage, where each website was a living tapestry of surreal landscapes, animated by whispering sprites and drifting runes. The boundaries between science and sorcery blurred as citizens consulted visualized prophecies, traded mystic relics, and even summoned intelligent digital phantoms to debate philosophy and predict the future—a virtual realm where every click was a spell and every message a magical incantation setting the stage for a renaissance of the human spirit."""
+        ),
+    ScenarioTemplate(
+            name="cyberpunk",
+            description="Dystopian internet dominated by megacorporations and digital rebellion",
+            scenario="""In 2077, after the Corporate Wars, six megacorporations divided the remnants of the global network. This fractured internet, known as "NeoNet," is a digital battleground where corporate enclaves control verified citizens through neural interfaces, while the outcasts—digital nomads and rogue AI collectives—roam the unpatrolled dataflows of the Deep Grid. Information is the most valuable currency, traded in black market data-havens and protected by militarized ICE protocols that can trigger seizures or brain death in unauthorized users. Advertisements materialize unbidden in users' peripheral vision, personalized by invasive biometric monitoring. Those wealthy enough maintain digital avatars that persist autonomously in VR social clubs even while they sleep. Meanwhile, resistance networks mask communications as innocuous entertainment streams, sending coded messages through popular neural-dance recordings and augmented reality games. Corporations offer citizens the illusion of freedom while monitoring every digital footprint, using predictive algorithms to eliminate dissenters before they act—an internet built not for connection, but for control."""
+        ),
+    ScenarioTemplate(
+            name="solarpunk",
+            description="Optimistic eco-futurist internet focused on sustainability and community",
+            scenario="""In the early 2030s, after the Great Decentralization Movement, the internet transformed into the "Flourish Network"—a constellation of community-owned mesh networks powered by renewable energy. Data centers, once massive energy sinks, have been replaced by distributed microcenters housed in community gardens, rooftop solar arrays, and wind-powered co-ops. The new internet operates on a "Prosocial Protocol" that allocates bandwidth based on community benefit rather than profit potential. Urban farming collectives share realtime soil and climate data through tactile interfaces woven from recycled e-waste and biodegradable polymers. Instead of algorithms optimizing for engagement, the Attention Cooperative stewards digital spaces that enhance genuine human connection. Users navigate the network through immersive "groves"—collaborative spaces where information grows like living gardens, tended by community librarians and knowledge gardeners. Hyperlocal exchange platforms have replaced global e-commerce, with physical location and resource sharing embedded in the digital architecture. The barriers between online and offline have dissolved as augmented reality overlays show the ecological impact of physical actions and suggest community-sourced alternatives—an internet devoted not to extraction but to regeneration."""
+        ),
+    ScenarioTemplate(
+            name="retrofuturist",
+            description="1950s-style retrofuturist internet with atomic age aesthetics",
+            scenario="""Welcome to the "Atomnet," the gleaming electronic marvel of 1957! After the breakthrough of the Consolidated Vacuum Tube Computer (CVTC) by Bell Laboratories in 1951, home terminals became the pride of every modern American household. Your family's Atomnet Console, with its polished mahogany cabinet and glowing vacuum tubes, connects to Regional Information Centers through dedicated copper telephone trunk lines. Navigating information is a tactile experience—turning brass dials and pressing Bakelite buttons to tune into "frequencies" rather than web addresses. Housewives access the Electronic Home Advisory System for recipe cards and domestic science bulletins, while businessmen consult the Statistical Business Tabulation Grid. Children enjoy educational programming from the Academic Television Council, transmitting directly to the console's built-in radar screen. For just 35 cents per query, users can pose questions to EMERALD, the Electrical Mathematical Engine for Research and Logical Deduction, receiving printed responses on special atomic-age stationery. Television-Telephone convergence allows families to speak face-to-face with relatives in other Atomnet-equipped cities during designated connection periods. The system operates with perfect atomic precision, immune to the communist infiltration that threatens other communication networks—a technological testament to American ingenuity and optimism."""
+        ),
+)
 
 
 class ScenarioManager:
@@ -61,63 +182,105 @@ class ScenarioManager:
             templates_dir: Directory containing scenario template files
         """
         self.templates_dir = templates_dir
-        self.scenarios: Dict[str, ScenarioTemplate] = {}
+        # Joined once so save paths are plain string concatenation
+        self._templates_dir_prefix = templates_dir.rstrip('/\\') + os.sep
+        # Values are either loaded templates or, for scenarios that have
+        # not been accessed yet, the path of their JSON file
+        self.scenarios: Dict[str, Union[ScenarioTemplate, str]] = {}
+        # Maps the first 20 characters of each scenario text to its name so
+        # a scenario description can be resolved without scanning
+        self._prefix_to_name: Dict[str, str] = {}
         self._load_scenarios()
 
     def _load_scenarios(self) -> None:
         """Load all scenario templates from the templates directory."""
-        os.makedirs(self.templates_dir, exist_ok=True)
-        
-        # Load default scenarios if no files exist
-        if not any(f.endswith('.json') for f in os.listdir(self.templates_dir)):
-            self._create_default_scenarios()
-            
-        for filename in os.listdir(self.templates_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.templates_dir, filename)
-                try:
-                    with open(file_path, 'r') as f:
-                        scenario_data = json.load(f)
-                        scenario = ScenarioTemplate.from_dict(scenario_data)
-                        self.scenarios[scenario.name] = scenario
-                except Exception as e:
-                    print(f"Error loading scenario {filename}: {e}")
-
-    def _create_default_scenarios(self) -> None:
-        """Create default scenario templates."""
-        # EtherWeave scenario (the original)
-        etherweave = ScenarioTemplate(
-            name="etherweave",
-            description="Ancient magical internet powered by alchemy and arcane forces",
-            scenario="""Imagine a world where the Internet was not born from silicon and code but from the ancient, arcane machinations of alchemists in the late Renaissance. In this alternate timeline, mystics uncovered the secret of the "EtherWeave"—a luminous network spun from enchanted fibers and quantum spells that intertwined the minds of scholars, artists, and adventurers across Europe and beyond. Instead of servers, colossal magical conduits known as Arcanet Pillars powered communication, channeling not only information but also the very essence of human creativity, passion, and memory. Navigating the EtherWeave felt akin to embarking on a fantastical voyage, where each website was a living tapestry of surreal landscapes, animated by whispering sprites and drifting runes. The boundaries between science and sorcery blurred as citizens consulted visualized prophecies, traded mystic relics, and even summoned intelligent digital phantoms to debate philosophy and predict the future—a virtual realm where every click was a spell and every message a magical incantation setting the stage for a renaissance of the human spirit."""
-        )
-        
-        # Cyberpunk scenario
-        cyberpunk = ScenarioTemplate(
-            name="cyberpunk",
-            description="Dystopian internet dominated by megacorporations and digital rebellion",
-            scenario="""In 2077, after the Corporate Wars, six megacorporations divided the remnants of the global network. This fractured internet, known as "NeoNet," is a digital battleground where corporate enclaves control verified citizens through neural interfaces, while the outcasts—digital nomads and rogue AI collectives—roam the unpatrolled dataflows of the Deep Grid. Information is the most valuable currency, traded in black market data-havens and protected by militarized ICE protocols that can trigger seizures or brain death in unauthorized users. Advertisements materialize unbidden in users' peripheral vision, personalized by invasive biometric monitoring. Those wealthy enough maintain digital avatars that persist autonomously in VR social clubs even while they sleep. Meanwhile, resistance networks mask communications as innocuous entertainment streams, sending coded messages through popular neural-dance recordings and augmented reality games. Corporations offer citizens the illusion of freedom while monitoring every digital footprint, using predictive algorithms to eliminate dissenters before they act—an internet built not for connection, but for control."""
-        )
-        
-        # Solarpunk scenario
-        solarpunk = ScenarioTemplate(
-            name="solarpunk",
-            description="Optimistic eco-futurist internet focused on sustainability and community",
-            scenario="""In the early 2030s, after the Great Decentralization Movement, the internet transformed into the "Flourish Network"—a constellation of community-owned mesh networks powered by renewable energy. Data centers, once massive energy sinks, have been replaced by distributed microcenters housed in community gardens, rooftop solar arrays, and wind-powered co-ops. The new internet operates on a "Prosocial Protocol" that allocates bandwidth based on community benefit rather than profit potential. Urban farming collectives share realtime soil and climate data through tactile interfaces woven from recycled e-waste and biodegradable polymers. Instead of algorithms optimizing for engagement, the Attention Cooperative stewards digital spaces that enhance genuine human connection. Users navigate the network through immersive "groves"—collaborative spaces where information grows like living gardens, tended by community librarians and knowledge gardeners. Hyperlocal exchange platforms have replaced global e-commerce, with physical location and resource sharing embedded in the digital architecture. The barriers between online and offline have dissolved as augmented reality overlays show the ecological impact of physical actions and suggest community-sourced alternatives—an internet devoted not to extraction but to regeneration."""
-        )
+        # The built-in defaults are registered straight from source; user
+        # JSON files found below overlay them by name
+        for scenario in _DEFAULT_SCENARIOS:
+            self.scenarios[scenario.name] = scenario
+            self._prefix_to_name[scenario.scenario[:20]] = scenario.name
 
-        # Retrofuturist scenario
-        retrofuturist = ScenarioTemplate(
-            name="retrofuturist",
-            description="1950s-style retrofuturist internet with atomic age aesthetics",
-            scenario="""Welcome to the "Atomnet," the gleaming electronic marvel of 1957! After the breakthrough of the Consolidated Vacuum Tube Computer (CVTC) by Bell Laboratories in 1951, home terminals became the pride of every modern American household. Your family's Atomnet Console, with its polished mahogany cabinet and glowing vacuum tubes, connects to Regional Information Centers through dedicated copper telephone trunk lines. Navigating information is a tactile experience—turning brass dials and pressing Bakelite buttons to tune into "frequencies" rather than web addresses. Housewives access the Electronic Home Advisory System for recipe cards and domestic science bulletins, while businessmen consult the Statistical Business Tabulation Grid. Children enjoy educational programming from the Academic Television Council, transmitting directly to the console's built-in radar screen. For just 35 cents per query, users can pose questions to EMERALD, the Electrical Mathematical Engine for Research and Logical Deduction, receiving printed responses on special atomic-age stationery. Television-Telephone convergence allows families to speak face-to-face with relatives in other Atomnet-equipped cities during designated connection periods. The system operates with perfect atomic precision, immune to the communist infiltration that threatens other communication networks—a technological testament to American ingenuity and optimism."""
-        )
-        
-        # Save default scenarios
-        self._save_scenario(etherweave)
-        self._save_scenario(cyberpunk)
-        self._save_scenario(solarpunk)
-        self._save_scenario(retrofuturist)
+        # The scandir we need anyway doubles as the existence probe, so no
+        # defensive makedirs stat on every construction
+        try:
+            it = os.scandir(self.templates_dir)
+        except FileNotFoundError:
+            os.makedirs(self.templates_dir, exist_ok=True)
+            return
+
+        # Single scandir pass: DirEntry carries the file type from the
+        # directory read itself, so no per-file stat or path join is needed
+        with it:
+            for entry in it:
+                # Suffix check first: it is a pure string operation, while
+                # is_file can cost a stat when d_type is unavailable
+                if not entry.name.endswith('.json'):
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                # Defer reading and parsing until the scenario is actually
+                # requested; the filename stem is the scenario name
+                self.scenarios[entry.name[:-len('.json')]] = entry.path
+
+    def _materialize(self, name: str) -> Optional[ScenarioTemplate]:
+        """
+        Resolve a scenario entry, loading its JSON file on first access.
+
+        Args:
+            name: Scenario name
+
+        Returns:
+            Loaded ScenarioTemplate, or None if missing or unreadable
+        """
+        value = self.scenarios.get(name)
+        if value is None or isinstance(value, ScenarioTemplate):
+            return value
+        try:
+            scenario = ScenarioTemplate.from_dict(_load_template_dict(value))
+        except _LOAD_ERRORS as e:
+            logger.warning("Error loading scenario %s: %s", value, e)
+            self.scenarios.pop(name, None)
+            return None
+        # Cache the instance back, keyed by the name the file declares
+        self.scenarios.pop(name, None)
+        self.scenarios[scenario.name] = scenario
+        self._prefix_to_name[scenario.scenario[:20]] = scenario.name
+        return scenario
+
+    def _materialize_all(self) -> None:
+        """Load any scenarios that are still path placeholders."""
+        pending = [(name, value) for name, value in self.scenarios.items()
+                   if not isinstance(value, ScenarioTemplate)]
+        if not pending:
+            return
+        if len(pending) == 1:
+            self._materialize(pending[0][0])
+            return
+
+        errors = []
+
+        def read_one(item):
+            name, path = item
+            try:
+                return name, ScenarioTemplate.from_dict(_load_template_dict(path))
+            except _LOAD_ERRORS as e:
+                errors.append(f"{path}: {e}")
+                return name, None
+
+        # File I/O releases the GIL, so threads overlap the per-file
+        # syscalls; the dict updates stay on this thread
+        with ThreadPoolExecutor(max_workers=min(8, len(pending))) as executor:
+            for name, scenario in executor.map(read_one, pending):
+                self.scenarios.pop(name, None)
+                if scenario is not None:
+                    self._register(scenario)
+        if errors:
+            # One log record for the whole pass instead of one per file
+            logger.warning("Error loading scenarios: %s", "; ".join(errors))
+
+    def export_default_scenarios(self) -> None:
+        """Write the built-in default scenarios out as JSON files."""
+        self.save_all(_DEFAULT_SCENARIOS)
 
     def _save_scenario(self, scenario: ScenarioTemplate) -> None:
         """
@@ -126,10 +289,69 @@ class ScenarioManager:
         Args:
             scenario: ScenarioTemplate to save
         """
-        file_path = os.path.join(self.templates_dir, f"{scenario.name}.json")
-        with open(file_path, 'w') as f:
-            json.dump(scenario.to_dict(), f, indent=2)
+        file_path = f"{self._templates_dir_prefix}{scenario.name}.json"
+        self._write_scenario_file(file_path, scenario)
+        self._register(scenario)
+
+    def _register(self, scenario: ScenarioTemplate) -> None:
+        """Index a template under its name and scenario-text prefix."""
         self.scenarios[scenario.name] = scenario
+        self._prefix_to_name[scenario.scenario[:20]] = scenario.name
+
+    @staticmethod
+    def _write_scenario_file(file_path: str, scenario: ScenarioTemplate, durable: bool = True) -> None:
+        """
+        Atomically write a template file.
+
+        The bytes go to a temp file that is fsynced and renamed over the
+        target, so a crash mid-write can never leave a truncated JSON for
+        the next load to choke on.
+
+        Args:
+            file_path: Destination path
+            scenario: Template to write
+            durable: Fsync before the rename; batch callers can defer
+                durability to a single sync at the end instead
+        """
+        tmp_path = f"{file_path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(scenario.to_json_bytes())
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+
+    def save_all(self, scenarios: List[ScenarioTemplate]) -> None:
+        """
+        Save many scenario templates with one flush at the end.
+
+        Args:
+            scenarios: Templates to save
+        """
+        for scenario in scenarios:
+            file_path = f"{self._templates_dir_prefix}{scenario.name}.json"
+            self._write_scenario_file(file_path, scenario, durable=False)
+            self._register(scenario)
+        # One global flush instead of an fsync per file
+        if hasattr(os, 'sync'):
+            os.sync()
+
+    def name_for_scenario_description(self, scenario_description: str) -> Optional[str]:
+        """
+        Resolve a scenario description back to its template name.
+
+        Args:
+            scenario_description: Full scenario text
+
+        Returns:
+            Name of the matching template, or None for ad-hoc descriptions
+        """
+        name = self._prefix_to_name.get(scenario_description[:20])
+        if name is None:
+            # Unloaded scenarios have not contributed their prefixes yet
+            self._materialize_all()
+            name = self._prefix_to_name.get(scenario_description[:20])
+        return name
 
     def get_scenario(self, name: str) -> Optional[ScenarioTemplate]:
         """
@@ -141,7 +363,7 @@ class ScenarioManager:
         Returns:
             ScenarioTemplate or None if not found
         """
-        return self.scenarios.get(name)
+        return self._materialize(name)
 
     def add_scenario(self, scenario: ScenarioTemplate) -> None:
         """
@@ -152,20 +374,21 @@ class ScenarioManager:
         """
         self._save_scenario(scenario)
 
-    def get_all_scenarios(self) -> List[ScenarioTemplate]:
+    def get_all_scenarios(self) -> Collection[ScenarioTemplate]:
         """
         Get all available scenarios.
-        
+
         Returns:
-            List of all scenarios
+            View of all scenarios; iterable and sized, but not indexable
         """
-        return list(self.scenarios.values())
-        
-    def get_scenario_names(self) -> List[str]:
+        self._materialize_all()
+        return self.scenarios.values()
+
+    def get_scenario_names(self) -> Collection[str]:
         """
         Get names of all available scenarios.
-        
+
         Returns:
-            List of scenario names
+            View of scenario names; iterable and sized, but not indexable
         """
-        return list(self.scenarios.keys())
\ No newline at end of file
+        return self.scenarios.keys()
\ No newline at end of file